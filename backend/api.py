@@ -1,12 +1,54 @@
 """REST API for Twenty Questions game."""
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from typing import Dict
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .core import GameState, MAX_QUESTIONS
-from .game_manager import GameManager
-from .handlers import handle_set_object, handle_answer_question, handle_ask_question, handle_make_guess
-
-app = FastAPI(title="Twenty Questions Game API")
+from fastapi.responses import JSONResponse
+from . import engine
+from .core import MAX_QUESTIONS
+from .deadline import Deadline, deadline_scope
+from .game_manager import GameManager, DEFAULT_SESSION
+from .llm_client import LLMError, LLMDeadlineExceeded, LLMCancelled, CassetteMiss, warm_up
+from .scheduler import AdmissionController, Overloaded, INTERACTIVE, BATCH, PRIORITY_CLASSES
+from .transcripts import save_transcript_if_finished
+from .tracing import start_trace, finish_trace, trace_scope, span
+
+REQUEST_DEADLINE = 60  # Seconds an LLM-bound request may take, retries included
+DISCONNECT_POLL_INTERVAL = 0.25  # Seconds between client disconnect checks
+SESSION_HEADER = "X-Session-Id"  # Optional, lets one server host many concurrent games
+PRIORITY_HEADER = "X-Priority"  # Optional, "batch" lowers a request's priority
+WARM_UP_RETRY_INTERVAL = 5  # Seconds between attempts to reach the LLM API at startup
+
+# Set once the LLM connection pool is warm, reported by /ready
+readiness = {"ready": False, "error": None}
+
+
+async def _warm_up_llm():
+    """Pre-open the LLM connection pool, retrying until the API is usable."""
+    while True:
+        try:
+            await run_in_threadpool(warm_up)
+        except LLMError as e:
+            readiness["error"] = str(e)
+            await asyncio.sleep(WARM_UP_RETRY_INTERVAL)
+            continue
+        readiness["ready"] = True
+        readiness["error"] = None
+        return
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so the health check answers immediately."""
+    task = asyncio.create_task(_warm_up_llm())
+    yield
+    task.cancel()
+
+
+app = FastAPI(title="Twenty Questions Game API", lifespan=lifespan)
 
 # CORS for React frontend
 app.add_middleware(
@@ -20,185 +62,143 @@ app.add_middleware(
 # Game manager instance
 game_manager = GameManager()
 
+# Admission control for LLM-bound requests
+admission = AdmissionController()
+
+# Record or replay LLM responses if LLM_CASSETTE_MODE is set
+if os.getenv("LLM_CASSETTE_MODE"):
+    from .cassette import install_from_env
+    install_from_env()
+
 
 # Helper functions
-def _get_game_or_404():
-    """Helper: Get current game or raise 404."""
-    game = game_manager.get_game()
+def _session_id(request: Request) -> str:
+    """Helper: Get the session ID of a request, falling back to the shared default."""
+    return request.headers.get(SESSION_HEADER) or DEFAULT_SESSION
+
+
+def _priority(request: Request, player1_type: str, player2_type: str) -> int:
+    """Helper: Batch priority for LLM-vs-LLM games, interactive otherwise.
+    
+    The client's X-Priority header can only lower the priority, so autoplay
+    traffic can't claim to be interactive.
+    """
+    priority = BATCH if player1_type == "llm" and player2_type == "llm" else INTERACTIVE
+    requested = PRIORITY_CLASSES.get(request.headers.get(PRIORITY_HEADER, "").lower())
+    if requested is not None:
+        priority = max(priority, requested)  # Higher values are lower priority
+    return priority
+
+
+def _get_game_or_404(request: Request):
+    """Helper: Get the request's game or raise 404."""
+    game = game_manager.get_game(_session_id(request))
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     return game
 
 
-def _process_question_answer(game: Dict, question: str, answer: str) -> None:
-    """Helper: Increment question count and record interaction."""
-    gs = game["game_state"]
-    gs.increment_question()
-    game["player2"].record_interaction(question, answer)
-
-
-def _build_question_answered_response(game: Dict, question: str, answer: str) -> Dict:
-    """Helper: Build response after a question is answered."""
-    gs = game["game_state"]
-    return {
-        "status": "question_answered",
-        "action": "question",
-        "question": question,
-        "answer": answer,
-        "question_count": gs.question_count,
-        "game_status": gs.status,
-        "game_over": not gs.is_playing(),
-        "object": gs.object if not gs.is_playing() else None,
-        "winner": "Player 1" if not gs.is_playing() else None
-    }
+def _game_lock(game: Dict) -> asyncio.Lock:
+    """Helper: Get the lock that serialises requests acting on one game."""
+    return game.setdefault("lock", asyncio.Lock())
+
+
+def _call_in_context(deadline: Deadline, tracer, route: str, func, *args):
+    """Helper: Run func with the request's deadline and tracer made current."""
+    with deadline_scope(deadline), trace_scope(tracer):
+        with span(route):
+            return func(*args)
+
+
+async def _run_llm_bound(request: Request, func, *args, priority: int = INTERACTIVE, new_game: bool = False,
+                         game: Dict = None):
+    """Helper: Run LLM-bound work off the event loop under a request deadline.
+    
+    The work first waits for an admission slot (time spent queued counts
+    against the deadline). If the client disconnects, the deadline is
+    cancelled so no further LLM calls or retries are started, but we still
+    wait for the worker to finish. Callers acting on an existing game hold its
+    `_game_lock` around this, so a retried request waits for the abandoned one
+    instead of mutating the game concurrently.
+    
+    The trace is handed to the background writer only after the admission
+    slot is released, so trace I/O isn't counted in the request's latency.
+    """
+    deadline = Deadline(REQUEST_DEADLINE)
+    session_id = _session_id(request)
+    route = f"{request.method} {request.url.path}"
+    try:
+        async with admission.admit(priority, session_id, timeout=deadline.remaining()):
+            tracer = start_trace(session_id, request.url.path.strip("/").replace("/", "_"), new_game)
+            work = asyncio.ensure_future(run_in_threadpool(_call_in_context, deadline, tracer, route, func, *args))
+            while not work.done():
+                await asyncio.wait({work}, timeout=DISCONNECT_POLL_INTERVAL)
+                if not work.done() and not deadline.is_cancelled() and await request.is_disconnected():
+                    deadline.cancel()
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail="Server busy, please retry",
+                            headers={"Retry-After": str(e.retry_after)})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out waiting for LLM capacity")
+    
+    finish_trace(tracer, game_over=game is not None and not game["game_state"].is_playing())
+    try:
+        return work.result()
+    except LLMCancelled:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except LLMDeadlineExceeded:
+        raise HTTPException(status_code=504, detail="LLM request deadline exceeded")
+    except CassetteMiss as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.exception_handler(engine.GameActionError)
+async def game_action_error_handler(request: Request, exc: engine.GameActionError):
+    """Report rejected game actions like HTTPException does."""
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.message})
 
 
 @app.post("/api/game")
-async def create_game(data: Dict):
+async def create_game(data: Dict, request: Request):
     """Create a new game."""
     player1_type = data.get("player1_type", "llm")
     player2_type = data.get("player2_type", "human")
-    
-    game_manager.create_game(player1_type, player2_type)
-    game = game_manager.get_game()  
-    game_state = game["game_state"]
-    player1 = game["player1"]
-    
-    # Player 1 sets object
-    if player1_type == "llm":
-        obj = player1.set_object()
-        if obj:
-            game_state.set_object(obj)
-            status = "playing" if player2_type == "llm" else "waiting_for_question"
-            return {
-                "status": status,
-                "question_count": game_state.question_count
-            }
-        raise HTTPException(status_code=500, detail="Failed to set object")
-    
-    return {
-        "status": "waiting_for_object",
-        "message": "Please set the object"
-    }
+    session_id = _session_id(request)
+    priority = _priority(request, player1_type, player2_type)
+    return await _run_llm_bound(request, _start_game, player1_type, player2_type, session_id,
+                                priority=priority, new_game=True)
+
+
+def _start_game(player1_type: str, player2_type: str, session_id: str) -> Dict:
+    """Create the game and let an LLM Player 1 choose its object."""
+    game_manager.create_game(player1_type, player2_type, session_id)
+    return engine.start_game(game_manager.get_game(session_id))
 
 
 @app.post("/api/game/object")
-async def set_object(data: Dict):
+async def set_object(data: Dict, request: Request):
     """Set object when Player 1 is human."""
-    game = _get_game_or_404()
-    
-    obj = data.get("object", "").strip()
-    if not obj:
-        raise HTTPException(status_code=400, detail="Object required")
+    game = _get_game_or_404(request)
     
-    game["game_state"].set_object(obj)
-    
-    return {
-        "status": "playing",
-        "question_count": game["game_state"].question_count
-    }
+    async with _game_lock(game):
+        return engine.set_object(game, data.get("object", "").strip())
 
 
 @app.get("/api/game/next")
-async def get_next_action():
+async def get_next_action(request: Request):
     """Get the next action."""
-    game = _get_game_or_404()
-    gs = game["game_state"]
-    
-    # Early returns for finished game
-    if not gs.is_playing():
-        return {
-            "status": "game_over",
-            "game_over": True,
-            "game_status": gs.status,
-            "object": gs.object,
-            "question_count": gs.question_count,
-            "winner": "Player 2" if gs.status == "won" else "Player 1"
-        }
-    
-    # If human Player 1 needs to answer, wait
-    if game.get("pending_question"):
-        return {
-            "status": "waiting_for_answer",
-            "question": game["pending_question"],
-            "question_count": gs.question_count
-        }
-    
-    # Only proceed if Player 2 is LLM (human Player 2 uses /api/game/action)
-    if game["player2_type"] == "llm":
-        action = game["player2"].decide_action()  # "guess" or "question"
-    else:
-        return {
-            "status": "waiting_for_decision",
-            "question_count": gs.question_count
-        }
-    
-    # Process LLM Player 2's decision
-    if action == "guess":
-        guess = game["player2"].make_guess()
-        if guess:
-            gs.increment_question()
-            if guess.lower() == gs.object.lower():
-                gs.win()
-                return {
-                    "status": "game_over",
-                    "game_over": True,
-                    "action": "guess",
-                    "guess": guess,
-                    "correct": True,
-                    "object": gs.object,
-                    "question_count": gs.question_count,
-                    "winner": "Player 2"
-                }
-            else:
-                # Wrong guess, record it so LLM doesn't repeat
-                game["player2"].record_incorrect_guess(guess)
-                if gs.is_playing():
-                    return {
-                        "status": "guess_incorrect",
-                        "action": "guess",
-                        "guess": guess,
-                        "correct": False,
-                        "question_count": gs.question_count
-                    }
-                else:
-                    # Game over, no questions left
-                    return {
-                        "status": "game_over",
-                        "game_over": True,
-                        "action": "guess",
-                        "guess": guess,
-                        "correct": False,
-                        "object": gs.object,
-                        "question_count": gs.question_count,
-                        "winner": "Player 1"
-                    }
-    else:
-        # Ask a question (Player 2 is LLM, already verified)
-        question = game["player2"].ask_question()
-        if question:
-            # Get answer from Player 1
-            if game["player1_type"] == "llm":
-                # LLM Player 1 answers immediately
-                answer = game["player1"].answer_question(question)
-                _process_question_answer(game, question, answer)
-                return _build_question_answered_response(game, question, answer)
-            else:
-                # Human Player 1, store question and wait for answer
-                game["pending_question"] = question
-                return {
-                    "status": "waiting_for_answer",
-                    "question": question,
-                    "question_count": gs.question_count
-                }
-    
-    return {"status": "error", "message": "Unable to determine next action"}
+    game = _get_game_or_404(request)
+    priority = _priority(request, game["player1_type"], game["player2_type"])
+    async with _game_lock(game):
+        response = await _run_llm_bound(request, engine.step, game, priority=priority, game=game)
+        save_transcript_if_finished(game)
+    return response
 
 
 @app.post("/api/game/action")
-async def submit_action(data: Dict):
+async def submit_action(data: Dict, request: Request):
     """Submit human player action."""
-    game = _get_game_or_404()
+    game = _get_game_or_404(request)
     gs = game["game_state"]
     
     if not gs.is_playing():
@@ -207,25 +207,22 @@ async def submit_action(data: Dict):
     action_type = data.get("action_type")
     content = data.get("content", "").strip()
     
-    # Route to handler based on action_type
-    handlers = {
-        "set_object": handle_set_object,
-        "answer_question": handle_answer_question,
-        "ask_question": handle_ask_question,
-        "make_guess": handle_make_guess
-    }
-    
-    handler = handlers.get(action_type)
-    if not handler:
+    # Reject unknown actions before queueing for an LLM slot
+    if action_type not in engine.ACTION_HANDLERS:
         raise HTTPException(status_code=400, detail="Invalid action type")
     
-    return handler(game, content)
+    priority = _priority(request, game["player1_type"], game["player2_type"])
+    async with _game_lock(game):
+        response = await _run_llm_bound(request, engine.apply_action, game, action_type, content,
+                                        priority=priority, game=game)
+        save_transcript_if_finished(game)
+    return response
 
 
 @app.get("/api/game")
-async def get_game_state():
+async def get_game_state(request: Request):
     """Get current game state."""
-    game = _get_game_or_404()
+    game = _get_game_or_404(request)
     gs = game["game_state"]
     
     return {
@@ -244,3 +241,11 @@ async def get_game_state():
 async def root():
     """Health check."""
     return {"status": "ok", "message": "Twenty Questions Game API"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness check: 503 until the LLM connection has been warmed up."""
+    if not readiness["ready"]:
+        raise HTTPException(status_code=503, detail=readiness["error"] or "Warming up LLM connection")
+    return {"status": "ready"}
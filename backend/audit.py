@@ -0,0 +1,187 @@
+"""Offline answer-consistency audit of recorded games.
+
+Re-asks every question from the transcripts against the game's object and
+flags answers that disagree, then reports Player 1's accuracy per model.
+Questions are grouped by object and repeats of the same question (ignoring
+case and punctuation) are merged, so each distinct check is sent to the LLM
+only once. Paraphrases are deliberately kept apart, so an answer is only ever
+judged against a verdict for its own question.
+Verdicts are cached on disk, so reruns only pay for new questions.
+
+Example:
+    python -m backend.audit transcripts.jsonl --concurrency 16 --flags flags.jsonl
+"""
+import argparse
+import json
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from .llm_client import call_llm, DEFAULT_MODEL, LLMError
+from .prompts import get_answer_question_prompt
+from .transcripts import iter_transcripts
+from .validators import validate_yes_no
+
+BATCH_SIZE = 1000  # Games grouped together before verification; bounds memory use
+
+
+def _object_key(obj):
+    return obj.strip().lower()
+
+
+def _question_text(question):
+    """Question text without case or punctuation, the unit a verdict is cached for."""
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+class VerdictCache:
+    """Verified answers keyed by (model, object, question), optionally persisted as JSON Lines."""
+    
+    def __init__(self, path=None):
+        self.path = path
+        self.verdicts = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                        key = (record["model"], record["object"], record["question"])
+                        self.verdicts[key] = record["answer"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue  # A run killed mid-append can leave a truncated line
+    
+    def get(self, key):
+        return self.verdicts.get(key)
+    
+    def put_many(self, items):
+        """Store verdicts and append them to the cache file."""
+        self.verdicts.update(items)
+        if self.path and items:
+            with open(self.path, "a+") as f:
+                # Start on a fresh line if the last run was killed mid-append
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != "\n":
+                        f.write("\n")
+                for (model, obj, question), answer in items.items():
+                    record = {"model": model, "object": obj, "question": question, "answer": answer}
+                    f.write(json.dumps(record) + "\n")
+
+
+def verify_answer(obj, question, model):
+    """Ask the LLM the question again, returning "yes"/"no" or None on failure."""
+    messages = [{"role": "user", "content": get_answer_question_prompt(obj, question)}]
+    try:
+        return validate_yes_no(call_llm(messages, model=model))
+    except LLMError:
+        return None
+
+
+class AuditReport:
+    """Per-model answer accuracy and the list of flagged answers."""
+    
+    def __init__(self):
+        self.checked = defaultdict(int)
+        self.consistent = defaultdict(int)
+        self.unverified = defaultdict(int)
+        self.games = 0
+        self.flags = []
+    
+    def summary(self):
+        models = {}
+        for model in sorted(set(self.checked) | set(self.unverified)):
+            checked = self.checked[model]
+            models[model] = {
+                "checked": checked,
+                "consistent": self.consistent[model],
+                "unverified": self.unverified[model],
+                "accuracy": self.consistent[model] / checked if checked else None,
+            }
+        return {"games": self.games, "flagged": len(self.flags), "models": models}
+
+
+def _audit_batch(games, model, cache, pool, report):
+    """Verify every answered question in a batch of games."""
+    # Group questions by object so repeats across games share one check
+    groups = defaultdict(lambda: defaultdict(list))
+    for game in games:
+        if not game.get("object"):
+            continue
+        obj = _object_key(game["object"])
+        for turn in game.get("turns", []):
+            if "question" in turn:
+                groups[obj][_question_text(turn["question"])].append((game, turn))
+    
+    pending = {}
+    for obj, questions in groups.items():
+        for text, turns in questions.items():
+            key = (model, obj, text)
+            if cache.get(key) is None and key not in pending:
+                pending[key] = pool.submit(verify_answer, obj, turns[0][1]["question"], model)
+    
+    verdicts = {key: future.result() for key, future in pending.items()}
+    cache.put_many({key: answer for key, answer in verdicts.items() if answer})
+    
+    for obj, questions in groups.items():
+        for text, turns in questions.items():
+            verified = cache.get((model, obj, text))
+            for game, turn in turns:
+                answered_by = game.get("player1_model", "human")
+                if verified is None:
+                    report.unverified[answered_by] += 1
+                    continue
+                report.checked[answered_by] += 1
+                if turn["answer"] == verified:
+                    report.consistent[answered_by] += 1
+                else:
+                    report.flags.append({
+                        "session_id": game.get("session_id"),
+                        "object": game["object"],
+                        "question": turn["question"],
+                        "recorded": turn["answer"],
+                        "verified": verified,
+                        "model": answered_by,
+                    })
+
+
+def audit(path, model=DEFAULT_MODEL, concurrency=8, cache_path=None, batch_size=BATCH_SIZE):
+    """Audit all transcripts in `path`, streaming them in batches."""
+    cache = VerdictCache(cache_path)
+    report = AuditReport()
+    batch = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for game in iter_transcripts(path):
+            batch.append(game)
+            report.games += 1
+            if len(batch) >= batch_size:
+                _audit_batch(batch, model, cache, pool, report)
+                batch = []
+        if batch:
+            _audit_batch(batch, model, cache, pool, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check Player 1 answers in recorded games.")
+    parser.add_argument("transcripts", help="JSON Lines transcript file (see TRANSCRIPT_PATH)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model used to re-verify answers")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent LLM calls")
+    parser.add_argument("--cache", default="audit_cache.jsonl", help="Verdict cache file ('' to disable)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Games verified per batch")
+    parser.add_argument("--flags", help="Write flagged answers to this JSON Lines file")
+    args = parser.parse_args()
+    
+    report = audit(args.transcripts, args.model, args.concurrency, args.cache or None, args.batch_size)
+    print(json.dumps(report.summary(), indent=2))
+    if args.flags:
+        with open(args.flags, "w") as f:
+            for flag in report.flags:
+                f.write(json.dumps(flag) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Record/replay of LLM responses for offline regression runs and benchmarks.
+
+Set LLM_CASSETTE_MODE=record to save every LLM response, with its latency,
+in a content-addressed store under LLM_CASSETTE_DIR (default "cassettes").
+Set LLM_CASSETTE_MODE=replay to serve responses from that store instead of the
+API, and LLM_CASSETTE_TIMING=1 to also replay the recorded latencies. A request
+with no recording raises `CassetteMiss` rather than falling back to a default.
+
+Identical requests (e.g. every set_object prompt) are recorded in order and
+replayed round-robin, so a single game replays exactly. Interleaved
+concurrent games only replay deterministically if they are started in the
+same order they were recorded in.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from .llm_client import CassetteMiss, get_transport, set_transport
+
+CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE")  # "record" or "replay"
+CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "cassettes")
+CASSETTE_TIMING = os.getenv("LLM_CASSETTE_TIMING") == "1"
+
+
+def cassette_key(model, messages):
+    """Content hash of a request: the model plus its messages."""
+    payload = json.dumps({"model": model, "input": messages}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """On-disk store of recorded responses, one JSON Lines file per request hash.
+    
+    A file starts with the request (model and messages) and then holds one
+    line per recorded response, so recording a response is a single append.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.jsonl")
+    
+    def _load(self, key):
+        """Read a request's recorded responses into memory (caller holds the lock)."""
+        if key not in self._entries:
+            responses = []
+            try:
+                with open(self._path(key)) as f:
+                    for line in f:
+                        if line.strip():
+                            record = json.loads(line)
+                            if "response" in record:
+                                responses.append(record)
+            except FileNotFoundError:
+                pass
+            self._entries[key] = responses
+        return self._entries[key]
+    
+    def responses(self, key):
+        """Recorded responses for a request, oldest first."""
+        with self._lock:
+            return list(self._load(key))
+    
+    def append(self, key, model, messages, response, latency):
+        """Add a response to a request's recording."""
+        entry = {"response": response, "latency": latency}
+        with self._lock:
+            responses = self._load(key)
+            path = self._path(key)
+            lines = [json.dumps(entry)]
+            if not responses:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                lines.insert(0, json.dumps({"model": model, "messages": messages}))
+            with open(path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+            responses.append(entry)
+
+
+class RecordingTransport:
+    """Transport that records what another transport returns."""
+    
+    def __init__(self, store, inner):
+        self.store = store
+        self.inner = inner
+    
+    def __call__(self, messages, model, timeout):
+        start = time.perf_counter()
+        response = self.inner(messages, model, timeout)
+        latency = time.perf_counter() - start
+        self.store.append(cassette_key(model, messages), model, messages, response, latency)
+        return response
+
+
+class ReplayTransport:
+    """Transport that serves recorded responses without calling the API."""
+    
+    def __init__(self, store, replay_timing=False):
+        self.store = store
+        self.replay_timing = replay_timing
+        self._positions = defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def __call__(self, messages, model, timeout):
+        key = cassette_key(model, messages)
+        responses = self.store.responses(key)
+        if not responses:
+            raise CassetteMiss(f"No recorded response for request {key[:12]}")
+        with self._lock:
+            entry = responses[self._positions[key] % len(responses)]
+            self._positions[key] += 1
+        if self.replay_timing:
+            time.sleep(min(entry["latency"], timeout))
+        return entry["response"]
+    
+    def rewind(self):
+        """Start replaying every recording from its first response again."""
+        with self._lock:
+            self._positions.clear()
+
+
+def install(mode, directory=CASSETTE_DIR, replay_timing=CASSETTE_TIMING):
+    """Switch `call_llm` to recording or replaying through a cassette store."""
+    store = CassetteStore(directory)
+    if mode == "record":
+        set_transport(RecordingTransport(store, get_transport()))
+    elif mode == "replay":
+        set_transport(ReplayTransport(store, replay_timing))
+    else:
+        raise ValueError(f"Unknown cassette mode: {mode}")
+    return store
+
+
+def install_from_env():
+    """Install the cassette mode configured in the environment, if any."""
+    if CASSETTE_MODE:
+        install(CASSETTE_MODE)
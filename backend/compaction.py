@@ -0,0 +1,67 @@
+"""Conversation-history compaction for LLM Player 2's prompts.
+
+Past a threshold, older Q/A pairs are folded into a short constraint summary
+(what is known to be true or false about the object, and which guesses were
+wrong) while the most recent turns are kept verbatim. This keeps late-game
+prompts from growing with every turn.
+"""
+import math
+import os
+import re
+
+COMPACTION_THRESHOLD = int(os.getenv("HISTORY_COMPACTION_THRESHOLD", "10"))  # History entries before compacting
+KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "4"))  # Latest entries always sent verbatim
+CHARS_PER_TOKEN = 4  # Rough average for English text
+
+# Question openings rewritten into statement form, tried in order
+_ATTRIBUTE_PREFIXES = [
+    (re.compile(r"^(?:is|are|was|were) (?:it|this|they|the object)\s+", re.IGNORECASE), ""),
+    (re.compile(r"^(?:does|do|did) (?:it|this|they|the object) (?:have|has)\s+", re.IGNORECASE), "has "),
+    (re.compile(r"^(?:has|have) (?:it|this|they|the object)\s+", re.IGNORECASE), "has "),
+    (re.compile(r"^(?:does|do|did) (?:it|this|they|the object)\s+", re.IGNORECASE), ""),
+    (re.compile(r"^(can|could|would|will) (?:it|this|they|the object)\s+", re.IGNORECASE), r"\1 "),
+    (re.compile(r"^(can|could|would|will|do) (you|people|someone)\s+", re.IGNORECASE), r"\2 \1 "),
+]
+
+
+def estimate_tokens(text):
+    """Approximate token count of a prompt."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def question_to_attribute(question):
+    """Turn a question into a short statement about the object.
+    
+    "Is it an animal?" becomes "an animal", "Does it have wheels?" becomes
+    "has wheels" and "Can you hold it in one hand?" becomes "you can hold it in
+    one hand". Questions in other forms are kept as they are, minus the "?".
+    """
+    question = question.strip().rstrip("?").strip()
+    for pattern, replacement in _ATTRIBUTE_PREFIXES:
+        match = pattern.match(question)
+        if match:
+            return match.expand(replacement).lower() + question[match.end():]
+    return question
+
+
+def compact_history(conversation_history, threshold=COMPACTION_THRESHOLD, keep_recent=KEEP_RECENT):
+    """Split history into a summary of older turns and the recent turns.
+    
+    Returns (None, conversation_history) while the history is below the threshold.
+    """
+    if len(conversation_history) <= threshold:
+        return None, conversation_history
+    
+    split = len(conversation_history) - keep_recent
+    if split <= 0:
+        return None, conversation_history  # Everything is recent enough to keep verbatim
+    older, recent = conversation_history[:split], conversation_history[split:]
+    summary = {"known_true": [], "known_false": [], "excluded_guesses": []}
+    for qa in older:
+        if qa["question"].startswith("Guess:") and qa["answer"] == "incorrect":
+            summary["excluded_guesses"].append(qa["question"].replace("Guess: ", ""))
+        elif qa["answer"] == "yes":
+            summary["known_true"].append(question_to_attribute(qa["question"]))
+        else:
+            summary["known_false"].append(question_to_attribute(qa["question"]))
+    return summary, recent
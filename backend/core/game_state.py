@@ -12,6 +12,7 @@ class GameState:
         self.question_count = 0
         self.status = PLAYING
         self.object = None
+        self.history = [] # Questions and guesses in order, for transcripts
     
     def increment_question(self):
         """Increment question count and check win/loss conditions."""
@@ -19,6 +20,14 @@ class GameState:
         if self.question_count >= MAX_QUESTIONS:
             self.status = LOST
     
+    def record_question(self, question, answer):
+        """Record an answered question."""
+        self.history.append({"question": question, "answer": answer})
+    
+    def record_guess(self, guess, correct):
+        """Record a guess and whether it was correct."""
+        self.history.append({"guess": guess, "correct": correct})
+    
     def set_object(self, obj):
         """Set the object Player 1 is thinking of."""
         self.object = obj
@@ -0,0 +1,58 @@
+"""Per-request deadlines and cancellation for LLM-bound work."""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_deadline = ContextVar("current_deadline", default=None)
+
+
+class Deadline:
+    """Time budget for a single request, shared by every LLM call it makes.
+    
+    The deadline can also be cancelled (e.g. when the client disconnects),
+    which makes it expire immediately and wakes any pending retry sleep.
+    """
+    
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+    
+    def remaining(self):
+        """Seconds left before the deadline (never negative)."""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        """Check if the deadline has passed."""
+        return self.remaining() <= 0
+    
+    def cancel(self):
+        """Cancel the request, abandoning any remaining work."""
+        self._cancelled.set()
+    
+    def is_cancelled(self):
+        """Check if the request was cancelled."""
+        return self._cancelled.is_set()
+    
+    def sleep(self, seconds):
+        """Sleep for up to `seconds`, returning False if the budget runs out first."""
+        if seconds >= self.remaining():
+            return False
+        return not self._cancelled.wait(seconds)
+
+
+def get_current_deadline():
+    """Get the deadline of the request being processed, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Make `deadline` the current deadline for the enclosed block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
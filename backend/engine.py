@@ -0,0 +1,400 @@
+"""Turn engine for Twenty Questions, independent of HTTP.
+
+A game is the dict built by `new_game` (and stored by `GameManager`). Every
+function here advances a game and returns the same response dicts the REST
+API sends, so the routes in `api.py` are thin wrappers around it and batch
+jobs can drive thousands of games in one process with `step_many` or
+`run_games`.
+
+Example:
+    python -m backend.engine --games 1000 --concurrency 64 --transcripts transcripts.jsonl
+"""
+import argparse
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .constants import PLAYER1, PLAYER2
+from .core import GameState, MAX_QUESTIONS
+from .players import HumanPlayer, LLMPlayer
+from .tracing import traced
+
+MAX_STEPS = 2 * MAX_QUESTIONS + 5  # Guards batch runs against games that stop making progress
+
+
+class GameActionError(Exception):
+    """Raised for an action the game can't accept, with the matching HTTP status."""
+    
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def new_game(player1_type: str, player2_type: str, session_id: Optional[str] = None) -> Dict:
+    """Build a new game with its state and players."""
+    player_classes = {
+        "human": HumanPlayer,
+        "llm": LLMPlayer
+    }
+    
+    p1_class = player_classes.get(player1_type.lower(), LLMPlayer)
+    p2_class = player_classes.get(player2_type.lower(), HumanPlayer)
+    
+    game_state = GameState()
+    player1 = p1_class(PLAYER1, game_state)
+    player2 = p2_class(PLAYER2, game_state)
+    
+    return {
+        "session_id": session_id,
+        "game_state": game_state,
+        "player1": player1,
+        "player2": player2,
+        "player1_type": player1_type,
+        "player2_type": player2_type,
+        "pending_question": None
+    }
+
+
+@traced
+def process_question_answer(game: Dict, question: str, answer: str) -> None:
+    """Increment question count and record interaction."""
+    gs = game["game_state"]
+    gs.increment_question()
+    gs.record_question(question, answer)
+    game["player2"].record_interaction(question, answer)
+
+
+def build_question_answered_response(game: Dict, question: str, answer: str) -> Dict:
+    """Build response after a question is answered."""
+    gs = game["game_state"]
+    return {
+        "status": "question_answered",
+        "action": "question",
+        "question": question,
+        "answer": answer,
+        "question_count": gs.question_count,
+        "game_status": gs.status,
+        "game_over": not gs.is_playing(),
+        "object": gs.object if not gs.is_playing() else None,
+        "winner": "Player 1" if not gs.is_playing() else None
+    }
+
+
+def _ask(game: Dict, question: str) -> Dict:
+    """Put a question to Player 1: an LLM answers now, a human answers later."""
+    gs = game["game_state"]
+    if game["player1_type"] == "llm":
+        answer = game["player1"].answer_question(question)
+        process_question_answer(game, question, answer)
+        return build_question_answered_response(game, question, answer)
+    
+    # Human Player 1, store question and wait for answer
+    game["pending_question"] = question
+    return {
+        "status": "waiting_for_answer",
+        "question": question,
+        "question_count": gs.question_count
+    }
+
+
+def start_game(game: Dict) -> Dict:
+    """Let an LLM Player 1 choose its object, or ask a human Player 1 to set one."""
+    game_state = game["game_state"]
+    
+    # Player 1 sets object
+    if game["player1_type"] == "llm":
+        obj = game["player1"].set_object()
+        if obj:
+            game_state.set_object(obj)
+            status = "playing" if game["player2_type"] == "llm" else "waiting_for_question"
+            return {
+                "status": status,
+                "question_count": game_state.question_count
+            }
+        raise GameActionError("Failed to set object", status_code=500)
+    
+    return {
+        "status": "waiting_for_object",
+        "message": "Please set the object"
+    }
+
+
+def set_object(game: Dict, obj: str) -> Dict:
+    """Set the object directly (human Player 1)."""
+    if not obj:
+        raise GameActionError("Object required")
+    
+    game["game_state"].set_object(obj)
+    return {
+        "status": "playing",
+        "question_count": game["game_state"].question_count
+    }
+
+
+def step(game: Dict) -> Dict:
+    """Advance the game by one LLM Player 2 turn."""
+    gs = game["game_state"]
+    
+    # Early returns for finished game
+    if not gs.is_playing():
+        return {
+            "status": "game_over",
+            "game_over": True,
+            "game_status": gs.status,
+            "object": gs.object,
+            "question_count": gs.question_count,
+            "winner": "Player 2" if gs.status == "won" else "Player 1"
+        }
+    
+    # If human Player 1 needs to answer, wait
+    if game.get("pending_question"):
+        return {
+            "status": "waiting_for_answer",
+            "question": game["pending_question"],
+            "question_count": gs.question_count
+        }
+    
+    # Only proceed if Player 2 is LLM (human Player 2 uses apply_action)
+    if game["player2_type"] != "llm":
+        return {
+            "status": "waiting_for_decision",
+            "question_count": gs.question_count
+        }
+    
+    # Process LLM Player 2's decision
+    if game["player2"].decide_action() == "guess":
+        guess = game["player2"].make_guess()
+        if guess:
+            gs.increment_question()
+            correct = guess.lower() == gs.object.lower()
+            gs.record_guess(guess, correct)
+            if correct:
+                gs.win()
+                return {
+                    "status": "game_over",
+                    "game_over": True,
+                    "action": "guess",
+                    "guess": guess,
+                    "correct": True,
+                    "object": gs.object,
+                    "question_count": gs.question_count,
+                    "winner": "Player 2"
+                }
+            # Wrong guess, record it so LLM doesn't repeat
+            game["player2"].record_incorrect_guess(guess)
+            if gs.is_playing():
+                return {
+                    "status": "guess_incorrect",
+                    "action": "guess",
+                    "guess": guess,
+                    "correct": False,
+                    "question_count": gs.question_count
+                }
+            # Game over, no questions left
+            return {
+                "status": "game_over",
+                "game_over": True,
+                "action": "guess",
+                "guess": guess,
+                "correct": False,
+                "object": gs.object,
+                "question_count": gs.question_count,
+                "winner": "Player 1"
+            }
+    else:
+        question = game["player2"].ask_question()
+        if question:
+            return _ask(game, question)
+    
+    return {"status": "error", "message": "Unable to determine next action"}
+
+
+def handle_set_object(game: Dict, content: str) -> Dict:
+    """Handle setting object when Player 1 is human."""
+    if game["player1_type"] != "human":
+        raise GameActionError("Only human Player 1 can set object")
+    
+    game["game_state"].set_object(content)
+    return {
+        "status": "playing",
+        "question_count": game["game_state"].question_count,
+        "max_questions": MAX_QUESTIONS,
+        "player1_type": game["player1_type"],
+        "player2_type": game["player2_type"]
+    }
+
+
+def handle_answer_question(game: Dict, content: str) -> Dict:
+    """Handle Player 1 answering a question."""
+    if not game.get("pending_question"):
+        raise GameActionError("No pending question")
+    
+    answer = content.lower()
+    if answer not in ["yes", "no", "y", "n"]:
+        raise GameActionError("Answer must be yes/no")
+    
+    answer = "yes" if answer in ["yes", "y"] else "no"
+    question = game["pending_question"]
+    game["pending_question"] = None
+    
+    process_question_answer(game, question, answer)
+    return build_question_answered_response(game, question, answer)
+
+
+def handle_ask_question(game: Dict, content: str) -> Dict:
+    """Handle Player 2 asking a question."""
+    if game["player2_type"] != "human":
+        raise GameActionError("Only human Player 2 can ask questions")
+    
+    if not content:
+        raise GameActionError("Question required")
+    
+    return _ask(game, content)
+
+
+def handle_make_guess(game: Dict, content: str) -> Dict:
+    """Handle Player 2 making a guess."""
+    if game["player2_type"] != "human":
+        raise GameActionError("Only human Player 2 can make guesses")
+    
+    if not content:
+        raise GameActionError("Guess required")
+    
+    # Validate guess is reasonable (1-2 words max)
+    words = content.strip().split()
+    if len(words) > 2:
+        raise GameActionError("Please enter only the object name (1-2 words max)")
+    
+    guess = content
+    gs = game["game_state"]
+    gs.increment_question()
+    correct = guess.lower() == gs.object.lower()
+    gs.record_guess(guess, correct)
+    
+    if correct:
+        gs.win()
+        return {
+            "status": "game_over",
+            "guess": guess,
+            "correct": True,
+            "object": gs.object,
+            "question_count": gs.question_count,
+            "winner": "Player 2"
+        }
+    # Wrong guess, game continues if questions remain
+    if gs.is_playing():
+        return {
+            "status": "waiting_for_question",
+            "guess": guess,
+            "correct": False,
+            "question_count": gs.question_count,
+            "max_questions": MAX_QUESTIONS,
+            "message": "Wrong guess! You can ask another question or make another guess."
+        }
+    # Game over, no questions left
+    return {
+        "status": "game_over",
+        "guess": guess,
+        "correct": False,
+        "object": gs.object,
+        "question_count": gs.question_count,
+        "winner": "Player 1"
+    }
+
+
+ACTION_HANDLERS = {
+    "set_object": handle_set_object,
+    "answer_question": handle_answer_question,
+    "ask_question": handle_ask_question,
+    "make_guess": handle_make_guess
+}
+
+
+def apply_action(game: Dict, action_type: str, content: str) -> Dict:
+    """Apply a human player's action."""
+    if not game["game_state"].is_playing():
+        raise GameActionError("Game is not in progress")
+    
+    handler = ACTION_HANDLERS.get(action_type)
+    if not handler:
+        raise GameActionError("Invalid action type")
+    return handler(game, content)
+
+
+def _safe_step(game: Dict) -> Dict:
+    """Step a game, turning failures into error responses so one game can't sink a batch."""
+    try:
+        return step(game)
+    except GameActionError as e:
+        return {"status": "error", "message": e.message}
+    except Exception as e:
+        return {"status": "error", "message": f"Unexpected error: {e}"}
+
+
+def _safe_start(game: Dict) -> Dict:
+    """Start a game, turning failures into error responses like `_safe_step`."""
+    try:
+        return start_game(game)
+    except GameActionError as e:
+        return {"status": "error", "message": e.message}
+    except Exception as e:
+        return {"status": "error", "message": f"Unexpected error: {e}"}
+
+
+def step_many(games: List[Dict], executor: ThreadPoolExecutor) -> List[Dict]:
+    """Advance every game by one step, running their LLM calls concurrently.
+    
+    Steps run with a copy of the caller's context, so a current deadline or
+    tracer applies to all of them. Returns one response per game, in order.
+    """
+    futures = [executor.submit(contextvars.copy_context().run, _safe_step, game) for game in games]
+    return [future.result() for future in futures]
+
+
+def run_games(games: List[Dict], executor: ThreadPoolExecutor, max_steps: int = MAX_STEPS) -> List[Dict]:
+    """Start the games and step them all until every one is over (LLM Player 2 only).
+    
+    Returns each game's last response.
+    """
+    futures = [executor.submit(contextvars.copy_context().run, _safe_start, game) for game in games]
+    last = [future.result() for future in futures]
+    
+    active = [i for i, response in enumerate(last) if response["status"] == "playing"]
+    for _ in range(max_steps):
+        if not active:
+            break
+        responses = step_many([games[i] for i in active], executor)
+        for i, response in zip(active, responses):
+            last[i] = response
+        # Drop finished games, and ones that failed to make a move
+        active = [i for i, response in zip(active, responses)
+                  if games[i]["game_state"].is_playing() and response["status"] != "error"]
+    return last
+
+
+def main():
+    from .transcripts import save_transcript_if_finished
+    
+    parser = argparse.ArgumentParser(description="Play LLM-vs-LLM games in-process.")
+    parser.add_argument("--games", type=int, default=100, help="Games to play")
+    parser.add_argument("--concurrency", type=int, default=32, help="Games stepped at once")
+    parser.add_argument("--transcripts", help="Append finished games to this JSON Lines file")
+    args = parser.parse_args()
+    
+    games = [new_game("llm", "llm", session_id=f"batch-{i}") for i in range(args.games)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        run_games(games, executor)
+    elapsed = time.perf_counter() - start
+    
+    won = sum(1 for game in games if game["game_state"].status == "won")
+    finished = sum(1 for game in games if not game["game_state"].is_playing())
+    if args.transcripts:
+        for game in games:
+            save_transcript_if_finished(game, args.transcripts)
+    print(f"{finished}/{len(games)} games finished in {elapsed:.1f}s, Player 2 won {won}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,39 @@
 """Game session management."""
+import threading
+from collections import OrderedDict
 from typing import Dict, Optional
-from .core import GameState
-from .players import HumanPlayer, LLMPlayer
-from .constants import PLAYER1, PLAYER2
+from .engine import new_game
+
+DEFAULT_SESSION = "default"
+MAX_SESSIONS = 1000  # Least recently used sessions are dropped beyond this
 
 
 class GameManager:
-    """Manages a single game session."""
+    """Manages game sessions, one game per session ID.
+    
+    Clients that don't send a session ID (such as the web frontend) all share
+    the default session, which keeps the original single-game behaviour.
+    """
     
-    def __init__(self):
-        self.game: Optional[Dict] = None
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.games: "OrderedDict[str, Dict]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
     
-    def create_game(self, player1_type: str, player2_type: str) -> None:
+    def create_game(self, player1_type: str, player2_type: str, session_id: str = DEFAULT_SESSION) -> None:
         """Create a new game session."""
-        player_classes = {
-            "human": HumanPlayer,
-            "llm": LLMPlayer
-        }
-        
-        p1_class = player_classes.get(player1_type.lower(), LLMPlayer)
-        p2_class = player_classes.get(player2_type.lower(), HumanPlayer)
+        game = new_game(player1_type, player2_type, session_id)
         
-        game_state = GameState()
-        player1 = p1_class(PLAYER1, game_state)
-        player2 = p2_class(PLAYER2, game_state)
-        
-        self.game = {
-            "game_state": game_state,
-            "player1": player1,
-            "player2": player2,
-            "player1_type": player1_type,
-            "player2_type": player2_type,
-            "pending_question": None
-        }
+        with self._lock:
+            self.games[session_id] = game
+            self.games.move_to_end(session_id)
+            while len(self.games) > self.max_sessions:
+                self.games.popitem(last=False)
     
-    def get_game(self) -> Optional[Dict]:
-        """Get current game session."""
-        return self.game
-
+    def get_game(self, session_id: str = DEFAULT_SESSION) -> Optional[Dict]:
+        """Get the game for a session."""
+        with self._lock:
+            game = self.games.get(session_id)
+            if game:
+                self.games.move_to_end(session_id)
+            return game
@@ -1,15 +1,18 @@
 """LLM client wrapper for the candidate API."""
 import os
+import threading
 import time
 import requests
-from dotenv import load_dotenv
-
-load_dotenv()
+from requests.adapters import HTTPAdapter
+from .tracing import span
 
 BASE_URL = "https://candidate-llm.extraction.artificialos.com/v1/responses"
-CANDIDATE_API_KEY = os.getenv("CANDIDATE_API_KEY")
 MAX_RETRIES = 3
 RETRY_DELAY = 1
+REQUEST_TIMEOUT = 30
+DEFAULT_MODEL = "gpt-5-mini-2025-08-07"
+POOL_SIZE = 32  # Keep-alive connections to the API, shared by all worker threads
+WARM_UP_TIMEOUT = 10
 
 
 class LLMError(Exception):
@@ -17,59 +20,198 @@ class LLMError(Exception):
     pass
 
 
-def call_llm(messages, model="gpt-5-mini-2025-08-07", max_retries=MAX_RETRIES):
-    """Call the LLM API with retry logic."""
-    if not CANDIDATE_API_KEY:
+class LLMDeadlineExceeded(LLMError):
+    """Raised when the request's time budget runs out before the LLM answers."""
+    pass
+
+
+class LLMCancelled(LLMError):
+    """Raised when the request was cancelled (e.g. the client disconnected)."""
+    pass
+
+
+class CassetteMiss(LLMError):
+    """Raised when replaying recorded responses and a request was never recorded."""
+    pass
+
+
+def _check_deadline(deadline):
+    """Raise if the deadline is cancelled or spent, otherwise return the attempt timeout."""
+    if deadline is None:
+        return REQUEST_TIMEOUT
+    if deadline.is_cancelled():
+        raise LLMCancelled("Request cancelled")
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise LLMDeadlineExceeded("Request deadline exceeded")
+    return min(REQUEST_TIMEOUT, remaining)
+
+
+def _wait_before_retry(deadline, wait_time):
+    """Sleep before retrying, raising if the deadline can't cover the wait."""
+    with span("llm_client.retry_sleep", wait_time=wait_time):
+        if deadline is None:
+            time.sleep(wait_time)
+            return
+        slept = deadline.sleep(wait_time)
+    if not slept:
+        if deadline.is_cancelled():
+            raise LLMCancelled("Request cancelled")
+        raise LLMDeadlineExceeded("Request deadline exceeded before retry")
+
+
+_api_key = None
+_session = None
+_setup_lock = threading.Lock()
+
+
+def _get_api_key():
+    """Read CANDIDATE_API_KEY, loading .env on first use rather than at import."""
+    global _api_key
+    if _api_key is None:
+        if not os.getenv("CANDIDATE_API_KEY"):
+            from dotenv import load_dotenv
+            load_dotenv()
+        _api_key = os.getenv("CANDIDATE_API_KEY") or ""
+    return _api_key
+
+
+def _get_session():
+    """Shared HTTP session, so calls reuse pooled keep-alive connections."""
+    global _session
+    with _setup_lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+            _session = session
+    return _session
+
+
+class RateLimited(LLMError):
+    """Raised by a transport when the API rejects a call with HTTP 429."""
+    pass
+
+
+def _http_transport(messages, model, timeout):
+    """Send one request to the candidate API and return the response text."""
+    response = _get_session().post(
+        BASE_URL,
+        headers={
+            "Content-Type": "application/json",
+            "x-api-key": _get_api_key()
+        },
+        json={
+            "model": model,
+            "input": messages
+        },
+        timeout=timeout
+    )
+    
+    if response.status_code == 200:
+        result = response.json()
+        
+        if result.get('output') and len(result['output']) > 1:
+            return result['output'][1]['content'][0]['text']
+        
+        raise LLMError("Invalid API response format")
+    
+    if response.status_code == 429:
+        raise RateLimited(f"Rate limited. Status: {response.status_code}")
+    
+    response.raise_for_status()
+    raise LLMError(f"Unexpected status: {response.status_code}")
+
+
+_transport = None
+
+
+def set_transport(transport):
+    """Replace the HTTP transport, e.g. with a simulated LLM for offline load tests.
+    
+    A transport is called as `transport(messages, model, timeout)` and returns the
+    response text. It may raise `RateLimited` or a `requests` exception to exercise
+    the retry logic. A transport that wraps another (e.g. to record it) exposes
+    the wrapped one as `inner`. Pass None to restore the real API.
+    """
+    global _transport
+    _transport = transport
+
+
+def get_transport():
+    """Get the transport `call_llm` currently uses."""
+    return _transport or _http_transport
+
+
+def _uses_http_transport():
+    """Whether the real API is called, directly or through wrapping transports."""
+    transport = get_transport()
+    while transport is not None:
+        if transport is _http_transport:
+            return True
+        transport = getattr(transport, "inner", None)
+    return False
+
+
+def warm_up(timeout=WARM_UP_TIMEOUT):
+    """Open a pooled connection to the API ahead of the first game turn.
+    
+    Pays DNS, TCP and TLS setup up front and checks the API key is accepted.
+    Raises LLMError if the API can't be used. Transports that never reach the
+    API (simulated or replayed responses) need no warm-up.
+    """
+    if not _uses_http_transport():
+        return
+    api_key = _get_api_key()
+    if not api_key:
+        raise LLMError("CANDIDATE_API_KEY not found in environment variables")
+    try:
+        response = _get_session().head(BASE_URL, headers={"x-api-key": api_key}, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise LLMError(f"LLM API unreachable: {e}")
+    if response.status_code in (401, 403):
+        raise LLMError(f"LLM API rejected the API key. Status: {response.status_code}")
+
+
+def call_llm(messages, model=DEFAULT_MODEL, max_retries=MAX_RETRIES, deadline=None):
+    """Call the LLM API with retry logic.
+    
+    If a `Deadline` is given, each attempt's timeout is shrunk to the time left
+    and no retry is started once the budget is spent or the request is cancelled.
+    """
+    transport = get_transport()
+    if transport is _http_transport and not _get_api_key():
         raise LLMError("CANDIDATE_API_KEY not found in environment variables")
     
     last_error = None
     
     for attempt in range(max_retries):
+        timeout = _check_deadline(deadline)
+        wait_time = RETRY_DELAY * (2 ** attempt)
         try:
-            response = requests.post(
-                BASE_URL,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": CANDIDATE_API_KEY
-                },
-                json={
-                    "model": model,
-                    "input": messages
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result.get('output') and len(result['output']) > 1:
-                    text_content = result['output'][1]['content'][0]['text']
-                    return text_content.strip()
-                
-                raise LLMError("Invalid API response format")
-            
-            elif response.status_code == 429:
-                # Rate limit, retry using exponential backoff
-                wait_time = RETRY_DELAY * (2 ** attempt)
-                if attempt < max_retries - 1:
-                    time.sleep(wait_time)
-                    continue
-                raise LLMError(f"Rate limited. Status: {response.status_code}")
-            
-            else:
-                response.raise_for_status()
+            with span("llm_client.attempt", attempt=attempt, timeout=timeout, model=model):
+                return transport(messages, model, timeout).strip()
+        
+        except RateLimited:
+            # Rate limit, retry using exponential backoff
+            if attempt < max_retries - 1:
+                _wait_before_retry(deadline, wait_time)
+                continue
+            raise
         
         except (requests.exceptions.Timeout, requests.exceptions.RequestException) as e:
             # Network errors or timeouts, retry using exponential backoff
             last_error = str(e)
             if attempt < max_retries - 1:
-                wait_time = RETRY_DELAY * (2 ** attempt)
-                time.sleep(wait_time)
+                _wait_before_retry(deadline, wait_time)
                 continue
         
+        except LLMError:
+            raise
+        
         except Exception as e:
             raise LLMError(f"Unexpected error: {e}")
     
+    _check_deadline(deadline)  # Report a spent budget rather than a generic failure
     raise LLMError(f"API call failed after {max_retries} attempts: {last_error}")
 
 
@@ -0,0 +1,387 @@
+"""HTTP load-test harness for the Twenty Questions API.
+
+Drives the real FastAPI app with a mix of game modes and reports per-route
+latency percentiles, throughput and error rate. By default the app is started
+in-process with a simulated LLM (see `--latency`), so capacity tests run offline.
+With `--cassette` the in-process app replays recorded LLM responses instead
+(see `backend/cassette.py`). Replay only reproduces LLM-vs-LLM games played one
+at a time, in the order they were recorded, so that mode is restricted to them.
+
+Examples:
+    python -m backend.loadtest --games 200 --concurrency 20
+    python -m backend.loadtest --rate 5 --duration 60 --mix llm_vs_llm=3,human_vs_llm=1
+    python -m backend.loadtest --cassette cassettes --replay-timing --mix llm_vs_llm --concurrency 1 --games 20
+    python -m backend.loadtest --url http://localhost:8000 --games 10
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from .core import MAX_QUESTIONS
+
+# Game modes: (player1_type, player2_type)
+MODES = {
+    "human_vs_llm": ("human", "llm"),  # Human thinks of an object, LLM asks
+    "llm_vs_human": ("llm", "human"),  # LLM thinks of an object, human asks
+    "llm_vs_llm": ("llm", "llm"),
+}
+OBJECTS = ["pencil", "dog", "apple", "car", "hammer", "shirt", "tree", "book", "elephant", "pizza",
+           "bicycle", "scissors", "penguin", "airplane", "lamp", "banana", "train", "kite"]
+# Distinct yes/no questions, so Player 2's duplicate check rarely has to regenerate
+QUESTIONS = (
+    [f"Is it made of {material}?" for material in
+     ["metal", "wood", "plastic", "glass", "paper", "fabric", "rubber", "stone", "leather"]]
+    + [f"Is it usually found in a {place}?" for place in
+       ["kitchen", "garden", "office", "bathroom", "school", "farm", "forest", "garage"]]
+    + [f"Is it a kind of {category}?" for category in
+       ["animal", "vehicle", "tool", "fruit", "toy", "furniture", "instrument", "plant", "clothing"]]
+    + [f"Is it {quality}?" for quality in
+       ["bigger than a car", "heavier than a person", "soft", "round", "sharp", "expensive", "edible"]]
+    + [f"Can it {ability}?" for ability in
+       ["fly", "swim", "hold water", "fit in a pocket", "make a sound", "be worn", "be thrown"]]
+    + ["Does it have wheels?", "Does it have legs?", "Does it need electricity?", "Does it grow?"]
+)
+MAX_STEPS = 2 * MAX_QUESTIONS + 5  # Guards against games that stop making progress
+
+
+# Latency models: callables taking an RNG and returning seconds
+def constant_latency(seconds):
+    """Every LLM call takes the same time."""
+    return lambda rng: seconds
+
+
+def lognormal_latency(median, sigma):
+    """Right-skewed latency around a median, like real LLM endpoints."""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def parse_latency_model(spec):
+    """Parse "constant:0.5" or "lognormal:0.8,0.4" into a latency model."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "constant":
+        return constant_latency(*values)
+    if kind == "lognormal":
+        return lognormal_latency(*values)
+    raise ValueError(f"Unknown latency model: {spec}")
+
+
+class SimulatedLLM:
+    """LLM transport that answers game prompts plausibly after a modelled delay."""
+    
+    def __init__(self, latency_model, guess_probability=0.15, seed=None):
+        self.latency_model = latency_model
+        self.guess_probability = guess_probability
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _reply(self, prompt):
+        """Pick a response based on which prompt template is being answered."""
+        if "Think of a common, concrete object" in prompt:
+            return self._rng.choice(OBJECTS)
+        if "You are thinking of:" in prompt:
+            return self._rng.choice(["yes", "no"])
+        if '"guess" or "question"' in prompt:
+            return "guess" if self._rng.random() < self.guess_probability else "question"
+        if "make your best guess" in prompt:
+            return self._rng.choice(OBJECTS)
+        # Like a real model, avoid the questions already listed in the game's history
+        asked = prompt.partition("Previous questions")[2]
+        fresh = [question for question in QUESTIONS if question not in asked]
+        return self._rng.choice(fresh or QUESTIONS)
+    
+    def __call__(self, messages, model, timeout):
+        with self._lock:
+            latency = self.latency_model(self._rng)
+            reply = self._reply(messages[-1]["content"])
+        if latency > timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.Timeout(f"Simulated LLM took {latency:.2f}s")
+        time.sleep(latency)
+        return reply
+
+
+class RouteStats:
+    """Thread-safe latency and error counters per route."""
+    
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.games = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+    
+    def record(self, route, latency, ok):
+        with self._lock:
+            self.latencies[route].append(latency)
+            if not ok:
+                self.errors[route] += 1
+    
+    def game_finished(self):
+        with self._lock:
+            self.games += 1
+    
+    def game_dropped(self):
+        with self._lock:
+            self.dropped += 1
+    
+    def summary(self, elapsed):
+        """Summarise per-route p50/p95/p99 latency, throughput and error rate."""
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            routes[route] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+                "error_rate": self.errors[route] / len(values),
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+            }
+        return {"elapsed_s": elapsed, "games": self.games, "dropped": self.dropped, "routes": routes}
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class GameClient:
+    """HTTP client for one simulated game, with its own session ID."""
+    
+    def __init__(self, base_url, stats):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.http = requests.Session()
+        self.http.headers["X-Session-Id"] = uuid.uuid4().hex
+    
+    def call(self, method, path, payload=None):
+        """Send a request, recording its latency under "METHOD path"."""
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, json=payload, timeout=120)
+            ok = response.status_code < 400
+            data = response.json() if ok else {}
+        except (requests.exceptions.RequestException, ValueError):
+            ok, data = False, {}
+        self.stats.record(f"{method} {path}", time.perf_counter() - start, ok)
+        return data if ok else None
+    
+    def close(self):
+        self.http.close()
+
+
+def _play_human_vs_llm(client, rng):
+    """Human Player 1 sets an object and answers the LLM's questions."""
+    if client.call("POST", "/api/game", {"player1_type": "human", "player2_type": "llm"}) is None:
+        return
+    if client.call("POST", "/api/game/object", {"object": rng.choice(OBJECTS)}) is None:
+        return
+    for _ in range(MAX_STEPS):
+        data = client.call("GET", "/api/game/next")
+        if data is None or data.get("game_over"):
+            return
+        if data.get("status") == "waiting_for_answer":
+            answer = {"action_type": "answer_question", "content": rng.choice(["yes", "no"])}
+            data = client.call("POST", "/api/game/action", answer)
+            if data is None or data.get("game_over"):
+                return
+
+
+def _play_llm_vs_human(client, rng):
+    """Human Player 2 asks questions and guesses against an LLM Player 1."""
+    if client.call("POST", "/api/game", {"player1_type": "llm", "player2_type": "human"}) is None:
+        return
+    for _ in range(MAX_STEPS):
+        if rng.random() < 0.2:
+            action = {"action_type": "make_guess", "content": rng.choice(OBJECTS)}
+        else:
+            action = {"action_type": "ask_question", "content": rng.choice(QUESTIONS)}
+        data = client.call("POST", "/api/game/action", action)
+        if data is None or data.get("status") == "game_over" or data.get("game_over"):
+            return
+
+
+def _play_llm_vs_llm(client, rng):
+    """Both players are LLMs; keep advancing like the frontend's autoplay."""
+    if client.call("POST", "/api/game", {"player1_type": "llm", "player2_type": "llm"}) is None:
+        return
+    for _ in range(MAX_STEPS):
+        data = client.call("GET", "/api/game/next")
+        if data is None or data.get("game_over"):
+            return
+
+
+PLAYBOOKS = {
+    "human_vs_llm": _play_human_vs_llm,
+    "llm_vs_human": _play_llm_vs_human,
+    "llm_vs_llm": _play_llm_vs_llm,
+}
+
+
+def parse_mix(spec):
+    """Parse "llm_vs_llm=2,human_vs_llm=1" into mode weights."""
+    mix = {}
+    for part in spec.split(","):
+        mode, _, weight = part.partition("=")
+        if mode not in MODES:
+            raise ValueError(f"Unknown game mode: {mode}")
+        mix[mode] = float(weight or 1)
+    return mix
+
+
+def play_game(base_url, mode, stats, rng):
+    """Play one game of the given mode to completion."""
+    client = GameClient(base_url, stats)
+    try:
+        PLAYBOOKS[mode](client, rng)
+    finally:
+        client.close()
+        stats.game_finished()
+
+
+def run_closed_loop(base_url, mix, stats, games, concurrency, seed=None):
+    """Run `concurrency` users that each start a new game as soon as the last ends."""
+    remaining = [games]
+    lock = threading.Lock()
+    modes, weights = list(mix), list(mix.values())
+    
+    def user(index):
+        rng = random.Random(None if seed is None else seed + index)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            play_game(base_url, rng.choices(modes, weights)[0], stats, rng)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(user, range(concurrency)))
+
+
+def run_open_loop(base_url, mix, stats, rate, duration, max_in_flight, seed=None):
+    """Start new games as a Poisson process at `rate` games/s for `duration` seconds.
+    
+    Arrivals don't wait for earlier games to finish, so server-side queueing
+    delay shows up in the latencies instead of silently lowering the offered
+    load. Arrivals while `max_in_flight` games are already running are counted
+    as dropped rather than queued in the client, where their wait would go
+    unmeasured.
+    """
+    rng = random.Random(seed)
+    modes, weights = list(mix), list(mix.values())
+    slots = threading.BoundedSemaphore(max_in_flight)
+    
+    def arrival(mode, game_rng):
+        try:
+            play_game(base_url, mode, stats, game_rng)
+        finally:
+            slots.release()
+    
+    end = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        next_arrival = time.monotonic()
+        while next_arrival < end:
+            time.sleep(max(0.0, next_arrival - time.monotonic()))
+            game_rng = random.Random(rng.random())
+            mode = rng.choices(modes, weights)[0]
+            if slots.acquire(blocking=False):
+                pool.submit(arrival, mode, game_rng)
+            else:
+                stats.game_dropped()
+            next_arrival += rng.expovariate(rate)
+
+
+def start_local_server(port):
+    """Start the API with uvicorn in a background thread and wait until it serves."""
+    import uvicorn
+    
+    config = uvicorn.Config("backend.api:app", host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def print_report(summary):
+    """Print a per-route latency table."""
+    print(f"{summary['games']} games in {summary['elapsed_s']:.1f}s")
+    if summary["dropped"]:
+        print(f"{summary['dropped']} arrivals dropped at the --max-in-flight cap")
+    print(f"{'route':<24}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}")
+    for route, s in summary["routes"].items():
+        print(f"{route:<24}{s['requests']:>7}{s['throughput_rps']:>8.1f}{s['error_rate'] * 100:>7.1f}"
+              f"{s['p50_ms']:>9.0f}{s['p95_ms']:>9.0f}{s['p99_ms']:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Twenty Questions API.")
+    parser.add_argument("--url", help="Target a running server instead of starting one with a simulated LLM")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the in-process server")
+    parser.add_argument("--mix", default="human_vs_llm=1,llm_vs_human=1,llm_vs_llm=1",
+                        help="Weighted game modes, e.g. llm_vs_llm=3,human_vs_llm=1")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4",
+                        help="Simulated LLM latency: constant:SECONDS or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--cassette", help="Replay recorded LLM responses from this directory")
+    parser.add_argument("--replay-timing", action="store_true", help="Replay recorded LLM latencies too")
+    parser.add_argument("--games", type=int, default=100, help="Games to play (closed loop)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent users (closed loop)")
+    parser.add_argument("--rate", type=float, help="Game arrivals per second (switches to open loop)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of arrivals (open loop)")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Concurrent games cap, later arrivals are dropped (open loop)")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible game traffic")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+    
+    mix = parse_mix(args.mix)
+    if args.cassette and not args.url:
+        # Replay is keyed on prompt content: random human turns and interleaved games
+        # produce prompts that were never recorded
+        if set(mix) != {"llm_vs_llm"} or args.rate or args.concurrency != 1:
+            parser.error("--cassette replays only --mix llm_vs_llm with --concurrency 1 (closed loop)")
+    server = None
+    base_url = args.url
+    if not base_url:
+        if args.cassette:
+            from . import cassette
+            cassette.install("replay", args.cassette, args.replay_timing)
+        else:
+            from . import llm_client
+            llm_client.set_transport(SimulatedLLM(parse_latency_model(args.latency), seed=args.seed))
+        server, thread = start_local_server(args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+    
+    stats = RouteStats()
+    start = time.perf_counter()
+    try:
+        if args.rate:
+            run_open_loop(base_url, mix, stats, args.rate, args.duration, args.max_in_flight, args.seed)
+        else:
+            run_closed_loop(base_url, mix, stats, args.games, args.concurrency, args.seed)
+    finally:
+        if server:
+            server.should_exit = True
+            thread.join()
+    
+    summary = stats.summary(time.perf_counter() - start)
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Opening book of early questions for LLM Player 2, mined from transcripts.
+
+The book is a tree keyed by the answers received so far. Each node holds
+the question that worked best from that point in recorded games. While a game
+stays on a path of the book, Player 2 asks the book's question instead of
+calling the LLM. Once the game leaves the book, Player 2 falls back to the LLM.
+
+Build it offline, then point OPENING_BOOK_PATH at the file. The server reloads
+the file when it changes, so a rebuilt book takes effect without a restart:
+
+    python -m backend.opening_book transcripts.jsonl opening_book.json --depth 3
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from .question_index import question_key
+from .transcripts import iter_transcripts
+
+OPENING_BOOK_PATH = os.getenv("OPENING_BOOK_PATH")
+OPENING_BOOK_DEPTH = int(os.getenv("OPENING_BOOK_DEPTH", "3"))  # Turns covered by a newly built book
+MIN_GAMES = 5  # Games a question needs at a node before it enters the book
+RELOAD_INTERVAL = 5  # Seconds between checks for a rebuilt book file
+
+
+def _opening(game, depth):
+    """The leading questions of a game (stopping at its first guess), and whether Player 2 won."""
+    opening = []
+    for turn in game.get("turns", [])[:depth]:
+        if "question" not in turn:
+            break
+        opening.append((question_key(turn["question"]), turn["question"], turn["answer"]))
+    return opening, game.get("status") == "won"
+
+
+def _score(stats):
+    """Rank candidate questions by win rate, then by fewer questions per game."""
+    win_rate = (stats["wins"] + 1) / (stats["games"] + 2)  # Smoothed towards 50%
+    return win_rate, -stats["question_total"] / stats["games"]
+
+
+def _build_node(games, level, depth, min_games):
+    """Pick the best question for games that reached this node, then recurse on its answers."""
+    candidates = defaultdict(lambda: {"games": 0, "wins": 0, "question_total": 0, "texts": defaultdict(int)})
+    for opening, won, question_count in games:
+        if len(opening) > level:
+            key, text, _ = opening[level]
+            stats = candidates[key]
+            stats["games"] += 1
+            stats["wins"] += won
+            stats["question_total"] += question_count
+            stats["texts"][text] += 1
+    
+    eligible = {key: stats for key, stats in candidates.items() if stats["games"] >= min_games}
+    if not eligible:
+        return None
+    
+    key, stats = max(eligible.items(), key=lambda item: _score(item[1]))
+    node = {
+        "key": key,
+        "question": max(stats["texts"], key=stats["texts"].get),  # Most common wording
+        "games": stats["games"],
+        "win_rate": stats["wins"] / stats["games"],
+        "children": {},
+    }
+    if level + 1 < depth:
+        for answer in ("yes", "no"):
+            followers = [g for g in games if len(g[0]) > level and g[0][level][0] == key and g[0][level][2] == answer]
+            child = _build_node(followers, level + 1, depth, min_games)
+            if child:
+                node["children"][answer] = child
+    return node
+
+
+def build_book(transcript_path, depth=OPENING_BOOK_DEPTH, min_games=MIN_GAMES):
+    """Mine a transcript file into an opening book tree."""
+    games = []
+    for game in iter_transcripts(transcript_path):
+        if game.get("player2_type") != "llm":
+            continue
+        opening, won = _opening(game, depth)
+        if opening:
+            games.append((opening, won, game.get("question_count", 0)))
+    return {"depth": depth, "games": len(games), "root": _build_node(games, 0, depth, min_games)}
+
+
+def save_book(book, path):
+    """Write a book atomically so a running server never reads half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(book, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class OpeningBook:
+    """A book file loaded in memory, reloaded when the file changes."""
+    
+    def __init__(self, path, max_depth=None, reload_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.max_depth = max_depth  # Optional cap on the depth the book was built with
+        self.reload_interval = reload_interval
+        self.root = None
+        self.depth = 0
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._maybe_reload()
+    
+    def _maybe_reload(self):
+        """Reload the book if the file changed since it was last read."""
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return
+                with open(self.path) as f:
+                    book = json.load(f)
+            except (OSError, ValueError):
+                return  # Keep serving the previous book
+            self.root = book.get("root")
+            self.depth = book.get("depth", 0)
+            self._mtime = mtime
+    
+    def next_question(self, conversation_history):
+        """The book's next question for this history, or None once out of book."""
+        self._maybe_reload()
+        depth = self.depth if self.max_depth is None else min(self.depth, self.max_depth)
+        if len(conversation_history) >= depth:
+            return None
+        node = self.root
+        for qa in conversation_history:
+            # Only follow games that asked exactly the book's questions so far
+            if node is None or question_key(qa["question"]) != node["key"]:
+                return None
+            node = node["children"].get(qa["answer"])
+        return node["question"] if node else None
+
+
+_book = None
+_book_lock = threading.Lock()
+
+
+def get_opening_book():
+    """The book configured by OPENING_BOOK_PATH, or None if there isn't one."""
+    global _book
+    if not OPENING_BOOK_PATH:
+        return None
+    with _book_lock:
+        if _book is None:
+            _book = OpeningBook(OPENING_BOOK_PATH)
+    return _book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from recorded games.")
+    parser.add_argument("transcripts", help="JSON Lines transcript file (see TRANSCRIPT_PATH)")
+    parser.add_argument("output", help="Where to write the book")
+    parser.add_argument("--depth", type=int, default=OPENING_BOOK_DEPTH, help="Turns covered by the book")
+    parser.add_argument("--min-games", type=int, default=MIN_GAMES, help="Games needed to trust a question")
+    args = parser.parse_args()
+    
+    book = build_book(args.transcripts, args.depth, args.min_games)
+    save_book(book, args.output)
+    print(f"Built opening book from {book['games']} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 """LLM player implementation."""
+import logging
 from ..core.player import Player
 from ..constants import PLAYER1, PLAYER2
-from ..llm_client import call_llm, LLMError
+from ..llm_client import call_llm, DEFAULT_MODEL, LLMError, LLMDeadlineExceeded, LLMCancelled, CassetteMiss
+from ..compaction import compact_history, estimate_tokens
+from ..deadline import get_current_deadline
+from ..opening_book import get_opening_book
+from ..question_index import QuestionIndex
+from ..tracing import span, traced
 from ..validators import validate_yes_no, validate_guess
 from ..prompts import (
     get_set_object_prompt,
@@ -11,42 +17,111 @@ from ..prompts import (
     get_answer_question_prompt
 )
 
+logger = logging.getLogger(__name__)
+
+MAX_DUPLICATE_RETRIES = 2  # Times Player 2 may regenerate a question that repeats history
+
 
 class LLMPlayer(Player):
     """LLM player that uses the API to play."""
     
-    def __init__(self, role, game_state):
+    def __init__(self, role, game_state, model=DEFAULT_MODEL):
         super().__init__(role, game_state)
+        self.model = model
         self.conversation_history = [] # Stores conversation history for LLM Player 2
         self.chosen_object = None # Stores object chosen by LLM Player 1
+        self.answer_index = QuestionIndex() # Player 1's answers, reused for paraphrased questions
+        self.indexed_object = None # Object the answer index belongs to
+        self.opening_book = get_opening_book() # Early questions for LLM Player 2, if configured
+        self.compaction_stats = [] # Estimated prompt tokens before/after history compaction
     
     def _call_llm(self, prompt, default=None):
-        """Helper method to call LLM with a prompt and handle errors."""
+        """Helper method to call LLM with a prompt and handle errors.
+        
+        Deadline and cancellation errors are not swallowed: falling back to a
+        default (e.g. answering "no") would corrupt the game for a request
+        nobody is waiting on any more. Neither are cassette misses, which would
+        turn a replay into a made-up game.
+        """
         try:
             messages = [{"role": "user", "content": prompt}]
-            result = call_llm(messages)
+            with span("llm.LLMPlayer._call_llm", prompt_chars=len(prompt)):
+                result = call_llm(messages, model=self.model, deadline=get_current_deadline())
             return result.strip() if result else default
+        except (LLMDeadlineExceeded, LLMCancelled, CassetteMiss):
+            raise
         except LLMError:
             return default
     
+    def _history_prompt(self, prompt_fn, **kwargs):
+        """Build a Player 2 prompt, summarising older history past the compaction threshold."""
+        summary, recent = compact_history(self.conversation_history)
+        prompt = prompt_fn(conversation_history=recent, summary=summary, **kwargs)
+        if summary is not None:
+            full_prompt = prompt_fn(conversation_history=self.conversation_history, **kwargs)
+            tokens_before, tokens_after = estimate_tokens(full_prompt), estimate_tokens(prompt)
+            # Summary headers can outweigh the savings on short histories
+            applied = tokens_after < tokens_before
+            if not applied:
+                prompt, tokens_after = full_prompt, tokens_before
+            stats = {
+                "prompt": prompt_fn.__name__,
+                "history": len(self.conversation_history),
+                "applied": applied,
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after
+            }
+            self.compaction_stats.append(stats)
+            logger.info("Compacted %(prompt)s history of %(history)d entries (applied: %(applied)s): "
+                        "~%(tokens_before)d -> ~%(tokens_after)d tokens", stats)
+        return prompt
+    
+    @traced
+    def _book_question(self):
+        """Next question from the opening book, or None once out of book."""
+        if self.opening_book is None:
+            return None
+        return self.opening_book.next_question(self.conversation_history)
+    
+    @traced
     def ask_question(self):
         """Player 2 asks a yes/no question using the LLM."""
         if self.role != PLAYER2:
             return None
-        prompt = get_ask_question_prompt(self.conversation_history)
-        return self._call_llm(prompt)
+        book_question = self._book_question()
+        if book_question:
+            return book_question
+        
+        asked = QuestionIndex()
+        for qa in self.conversation_history:
+            if not qa["question"].startswith("Guess:"):
+                asked.add(qa["question"])
+        
+        # Regenerate questions that paraphrase one already asked, since the
+        # answer is already known and asking again would waste a turn
+        rejected = []
+        question = None
+        for _ in range(MAX_DUPLICATE_RETRIES + 1):
+            prompt = self._history_prompt(get_ask_question_prompt, rejected_questions=rejected)
+            question = self._call_llm(prompt)
+            if not question or not asked.find(question):
+                return question
+            rejected.append(question)
+        return question
     
+    @traced
     def make_guess(self):
         """Player 2 makes a guess using the LLM."""
         if self.role != PLAYER2:
             return None
-        prompt = get_make_guess_prompt(self.conversation_history)
+        prompt = self._history_prompt(get_make_guess_prompt)
         guess = self._call_llm(prompt)
         if not guess:
             return None
         validated = validate_guess(guess)
         return validated if validated else guess
     
+    @traced
     def decide_action(self):
         """Decide whether to ask a question or make a guess."""
         if self.role != PLAYER2:
@@ -54,13 +129,16 @@ class LLMPlayer(Player):
         remaining = 20 - self.game_state.question_count
         if remaining < 2: # Force a guess when only 1 question remains
             return "guess"
+        if self._book_question(): # Still in the opening book, keep asking
+            return "question"
         
-        prompt = get_decide_action_prompt(remaining, self.conversation_history)
+        prompt = self._history_prompt(get_decide_action_prompt, remaining_questions=remaining)
         decision = self._call_llm(prompt, default="question")
         if decision and (decision.startswith("guess") or decision == "g"):
             return "guess"
         return "question"
     
+    @traced
     def set_object(self):
         """Player 1 thinks of an object using the LLM."""
         if self.role != PLAYER1:
@@ -73,19 +151,31 @@ class LLMPlayer(Player):
             return obj
         return None
     
+    @traced
     def answer_question(self, question):
         """Player 1 answers a yes/no question truthfully."""
         if self.role != PLAYER1:
             return None
         if not self.chosen_object:
             self.chosen_object = self.game_state.object
+        if self.indexed_object != self.chosen_object:
+            self.answer_index.clear()
+            self.indexed_object = self.chosen_object
+        
+        # Reuse the answer to a near-identical earlier question
+        with span("question_index.find"):
+            match = self.answer_index.find(question)
+        if match:
+            return match[1]
         
         prompt = get_answer_question_prompt(self.chosen_object, question)
         answer = self._call_llm(prompt, default="no")
         if not answer:
             return "no"
         validated = validate_yes_no(answer)
-        return validated if validated else "no"
+        answer = validated if validated else "no"
+        self.answer_index.add(question, answer)
+        return answer
     
     def record_interaction(self, question, answer):
         """Record a question-answer interaction."""
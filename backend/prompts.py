@@ -1,16 +1,33 @@
 """Prompt templates for LLM interactions in Twenty Questions game."""
+from .tracing import traced
 
 
-def _append_conversation_history(prompt, conversation_history, closing_instruction):
+def _format_summary(summary, include_guesses=True):
+    """Helper function to render a compacted history summary."""
+    lines = []
+    if summary["known_true"]:
+        lines.append(f"Yes: {'; '.join(summary['known_true'])}")
+    if summary["known_false"]:
+        lines.append(f"No: {'; '.join(summary['known_false'])}")
+    if include_guesses and summary["excluded_guesses"]:
+        lines.append(f"Wrong guesses: {', '.join(summary['excluded_guesses'])}")
+    return "\n\nEarlier answers about the object:\n" + "\n".join(lines)
+
+
+def _append_conversation_history(prompt, conversation_history, closing_instruction, summary=None):
     """Helper function to append conversation history to a prompt."""
+    if summary:
+        prompt += _format_summary(summary)
     if conversation_history:
         prompt += "\n\nPrevious questions and answers:\n"
         for qa in conversation_history:
             prompt += f"Q: {qa['question']}\nA: {qa['answer']}\n"
+    if summary or conversation_history:
         prompt += f"\n{closing_instruction}"
     return prompt
 
 
+@traced
 def get_set_object_prompt():
     """Generate prompt for Player 1 to choose an object."""
     return """You are playing Twenty Questions as Player 1. Think of a common, concrete object that someone could guess in 20 yes/no questions.
@@ -30,8 +47,12 @@ Make sure your object is:
 Pick ONE specific object. Respond with ONLY the object name, nothing else."""
 
 
-def get_ask_question_prompt(conversation_history):
-    """Generate prompt for Player 2 to ask a strategic question."""
+@traced
+def get_ask_question_prompt(conversation_history, rejected_questions=None, summary=None):
+    """Generate prompt for Player 2 to ask a strategic question.
+    
+    `summary` replaces older history entries once it has been compacted.
+    """
     prompt = """You are playing Twenty Questions as Player 2. Your goal is to guess the object Player 1 is thinking of by asking strategic yes/no questions.
 
 STRATEGY:
@@ -49,10 +70,13 @@ EXAMPLES OF GOOD QUESTIONS:
 
 Ask ONE strategic yes/no question that will help you narrow down what the object might be. Only ask the question, nothing else."""
 
+    if summary:
+        prompt += _format_summary(summary, include_guesses=False)
+    
     # Build history with incorrect guesses highlighted
+    incorrect_guesses = list(summary["excluded_guesses"]) if summary else []
     if conversation_history:
         prompt += "\n\nPrevious questions, answers, and guesses:\n"
-        incorrect_guesses = []
         for qa in conversation_history:
             if qa['question'].startswith("Guess:") and qa['answer'] == "incorrect":
                 guess = qa['question'].replace("Guess: ", "")
@@ -60,17 +84,26 @@ Ask ONE strategic yes/no question that will help you narrow down what the object
                 prompt += f"Guess: {guess} - INCORRECT\n"
             else:
                 prompt += f"Q: {qa['question']}\nA: {qa['answer']}\n"
-        
-        if incorrect_guesses:
-            prompt += f"\nNote: You already incorrectly guessed: {', '.join(incorrect_guesses)}. The object is not any of these."
+    
+    if incorrect_guesses:
+        prompt += f"\nNote: You already incorrectly guessed: {', '.join(incorrect_guesses)}. The object is not any of these."
+    
+    if rejected_questions:
+        prompt += "\n\nThese questions repeat something you already asked, do not ask them again:\n"
+        for question in rejected_questions:
+            prompt += f"- {question}\n"
     
     prompt += "\n\nBased on the information above, ask your next strategic question:"
     
     return prompt
 
 
-def get_make_guess_prompt(conversation_history):
-    """Generate prompt for Player 2 to make a guess."""
+@traced
+def get_make_guess_prompt(conversation_history, summary=None):
+    """Generate prompt for Player 2 to make a guess.
+    
+    `summary` replaces older history entries once it has been compacted.
+    """
     prompt = """You are playing Twenty Questions as Player 2. Based on all the questions and answers, make your best guess for what object Player 1 is thinking of.
 
 Think about what you've learned:
@@ -80,10 +113,13 @@ Think about what you've learned:
 
 IMPORTANT: If you see any "Guess: X" entries marked as "incorrect" in the history above, DO NOT guess that object again. Think of a different object that fits the information."""
 
+    if summary:
+        prompt += _format_summary(summary, include_guesses=False)
+    
     # Build history with incorrect guesses highlighted
+    incorrect_guesses = list(summary["excluded_guesses"]) if summary else []
     if conversation_history:
         prompt += "\n\nPrevious questions, answers, and guesses:\n"
-        incorrect_guesses = []
         for qa in conversation_history:
             if qa['question'].startswith("Guess:") and qa['answer'] == "incorrect":
                 guess = qa['question'].replace("Guess: ", "")
@@ -91,17 +127,21 @@ IMPORTANT: If you see any "Guess: X" entries marked as "incorrect" in the histor
                 prompt += f"Guess: {guess} - INCORRECT (do not guess this again)\n"
             else:
                 prompt += f"Q: {qa['question']}\nA: {qa['answer']}\n"
-        
-        if incorrect_guesses:
-            prompt += f"\nRemember: You already incorrectly guessed: {', '.join(incorrect_guesses)}. Do not guess these again."
+    
+    if incorrect_guesses:
+        prompt += f"\nRemember: You already incorrectly guessed: {', '.join(incorrect_guesses)}. Do not guess these again."
     
     prompt += "\n\nRespond with ONLY the object name, nothing else. Do not add prefixes like \"I think it's\" or \"My guess is\" - just state the object."
     
     return prompt
 
 
-def get_decide_action_prompt(remaining_questions, conversation_history):
-    """Generate prompt for Player 2 to decide whether to ask or guess."""
+@traced
+def get_decide_action_prompt(remaining_questions, conversation_history, summary=None):
+    """Generate prompt for Player 2 to decide whether to ask or guess.
+    
+    `summary` replaces older history entries once it has been compacted.
+    """
     prompt = f"""You are playing Twenty Questions as Player 2. You have {remaining_questions} questions remaining.
 
 DECISION CRITERIA:
@@ -118,10 +158,12 @@ IMPORTANT: Respond with ONLY the single word "guess" or "question", nothing else
     return _append_conversation_history(
         prompt,
         conversation_history,
-        "Based on the above, should you ask another question or make a guess?"
+        "Based on the above, should you ask another question or make a guess?",
+        summary
     )
 
 
+@traced
 def get_answer_question_prompt(chosen_object, question):
     """Generate prompt for Player 1 to answer a question truthfully."""
     return f"""You are playing Twenty Questions as Player 1. You are thinking of: {chosen_object}
@@ -0,0 +1,64 @@
+"""Near-duplicate detection for yes/no questions."""
+from .validators import normalize_question
+
+SIMILARITY_THRESHOLD = 0.8  # Jaccard similarity above which two questions count as the same
+
+
+def question_key(question):
+    """Canonical text of a question, shared by its paraphrases."""
+    return " ".join(normalize_question(question)) or question.strip().lower()
+
+
+def question_shingles(question):
+    """Token and token-bigram shingles of a normalised question."""
+    tokens = normalize_question(question)
+    shingles = set(tokens)
+    shingles.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return frozenset(shingles)
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class QuestionIndex:
+    """Questions seen for one object, with the answers they received.
+    
+    A game asks at most 20 questions about an object, so an exact scan over
+    the shingle sets is cheaper than maintaining MinHash signatures.
+    """
+    
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.entries = []  # (shingles, question, answer)
+    
+    def add(self, question, answer=None):
+        """Index a question and the answer it was given."""
+        shingles = question_shingles(question)
+        if shingles:
+            self.entries.append((shingles, question, answer))
+    
+    def find(self, question):
+        """Return the most similar (question, answer) above the threshold, or None.
+        
+        >>> index = QuestionIndex()
+        >>> index.add("Does it have wheels?", "yes")
+        >>> index.find("Does it have wheels")
+        ('Does it have wheels?', 'yes')
+        >>> index.find("Is it a wheel?") is None
+        True
+        """
+        shingles = question_shingles(question)
+        best, best_score = None, self.threshold
+        for entry_shingles, entry_question, entry_answer in self.entries:
+            score = jaccard(shingles, entry_shingles)
+            if score >= best_score:
+                best, best_score = (entry_question, entry_answer), score
+        return best
+    
+    def clear(self):
+        """Forget all indexed questions."""
+        self.entries = []
@@ -0,0 +1,116 @@
+"""Priority admission control for LLM-bound requests.
+
+Requests wait for one of a fixed number of LLM slots. Interactive work
+(games with a human player) is always admitted before batch work (LLM-vs-LLM
+autoplay, or requests marked "X-Priority: batch"), and within a class sessions
+take turns so a single busy game can't monopolise the server. When a class's
+queue is full the request is shed with `Overloaded`, which the API turns into
+503 with a Retry-After header.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_CLASSES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "16"))  # Requests running LLM work at once
+MAX_QUEUED = {
+    INTERACTIVE: int(os.getenv("LLM_MAX_QUEUED_INTERACTIVE", "64")),
+    BATCH: int(os.getenv("LLM_MAX_QUEUED_BATCH", "32")),
+}
+INITIAL_SERVICE_TIME = 2.0  # Seconds, until real request durations have been observed
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed because its priority queue is full."""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"Server overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admits LLM-bound requests by priority class, round-robin across sessions.
+    
+    Must be used from a single event loop.
+    """
+    
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queued=None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = dict(max_queued or MAX_QUEUED)
+        self.active = 0
+        self.queues = {cls: OrderedDict() for cls in self.max_queued}  # session_id -> deque of waiters
+        self.queued = {cls: 0 for cls in self.max_queued}
+        self.service_time = INITIAL_SERVICE_TIME  # Moving average of request durations
+    
+    def retry_after(self):
+        """Seconds until the current backlog has likely drained."""
+        backlog = sum(self.queued.values()) + self.active
+        return max(1, math.ceil(backlog / self.max_concurrent * self.service_time))
+    
+    @asynccontextmanager
+    async def admit(self, priority, session_id, timeout=None):
+        """Hold an LLM slot for the enclosed block.
+        
+        Raises `Overloaded` if the queue is full and `asyncio.TimeoutError`
+        if no slot frees up within `timeout` seconds.
+        """
+        await self._acquire(priority, session_id, timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.service_time = 0.9 * self.service_time + 0.1 * (time.monotonic() - start)
+            self.active -= 1
+            self._dispatch()
+    
+    async def _acquire(self, priority, session_id, timeout):
+        if self.active < self.max_concurrent and not any(self.queued.values()):
+            self.active += 1
+            return
+        if self.queued[priority] >= self.max_queued[priority]:
+            raise Overloaded(self.retry_after())
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues[priority].setdefault(session_id, deque()).append(waiter)
+        self.queued[priority] += 1
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if waiter.done() and not waiter.cancelled():
+                # A slot was granted just as we gave up, hand it on
+                self.active -= 1
+                self._dispatch()
+            else:
+                self._remove(priority, session_id, waiter)
+            raise
+    
+    def _remove(self, priority, session_id, waiter):
+        """Drop an abandoned waiter from its queue."""
+        waiters = self.queues[priority].get(session_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self.queued[priority] -= 1
+            if not waiters:
+                del self.queues[priority][session_id]
+    
+    def _dispatch(self):
+        """Grant free slots to waiters, highest priority first, rotating sessions."""
+        for cls in sorted(self.queues):
+            sessions = self.queues[cls]
+            while sessions and self.active < self.max_concurrent:
+                session_id, waiters = next(iter(sessions.items()))
+                waiter = waiters.popleft()
+                self.queued[cls] -= 1
+                if waiters:
+                    sessions.move_to_end(session_id)
+                else:
+                    del sessions[session_id]
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self.active += 1
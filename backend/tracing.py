@@ -0,0 +1,137 @@
+"""Opt-in span tracing exported as Chrome-trace/Perfetto JSON.
+
+Set TRACE_DIR to write one trace file per request into that directory, and
+TRACE_PER_GAME=1 to collect every request of a game into a single file instead,
+written once the game is over. Files are written by a background thread, so
+trace I/O doesn't add to the latency being traced. Open the files in
+chrome://tracing or https://ui.perfetto.dev.
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACE_DIR = os.getenv("TRACE_DIR")
+TRACE_PER_GAME = os.getenv("TRACE_PER_GAME") == "1"
+MAX_GAME_TRACERS = 1000  # Per-game traces kept in memory
+
+_current_tracer = ContextVar("current_tracer", default=None)
+_game_tracers = OrderedDict()
+_game_tracers_lock = threading.Lock()
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-writer")
+
+
+class Tracer:
+    """Collects complete ("X") trace events for one request or game."""
+    
+    def __init__(self, name):
+        self.name = name
+        self.events = []
+        self.written = False
+        self._lock = threading.Lock()
+    
+    def add_span(self, name, start, end, args=None):
+        """Record a span given perf_counter start and end times."""
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+    
+    def to_json(self):
+        """Chrome trace format document."""
+        with self._lock:
+            events = list(self.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"name": self.name}}
+    
+    def write(self, directory):
+        """Write the trace to `<directory>/<name>.json`, returning the path."""
+        os.makedirs(directory, exist_ok=True)
+        filename = re.sub(r"[^A-Za-z0-9_.-]", "_", self.name)  # Session IDs come from clients
+        path = os.path.join(directory, f"{filename}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f)
+        return path
+
+
+def start_trace(session_id, route, new_game=False):
+    """Get the tracer for a request, or None when tracing is off.
+    
+    In per-game mode the tracer is shared by all requests of the session and
+    restarted when a new game is created.
+    """
+    if not TRACE_DIR:
+        return None
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    if not TRACE_PER_GAME:
+        return Tracer(f"{timestamp}-{session_id}-{route}-{time.perf_counter_ns()}")
+    with _game_tracers_lock:
+        tracer = _game_tracers.get(session_id)
+        if tracer is None or new_game:
+            tracer = Tracer(f"{timestamp}-{session_id}-game")
+            _game_tracers[session_id] = tracer
+        _game_tracers.move_to_end(session_id)
+        while len(_game_tracers) > MAX_GAME_TRACERS:
+            _game_tracers.popitem(last=False)
+    return tracer
+
+
+def finish_trace(tracer, game_over=False):
+    """Queue a request's trace for writing, or in per-game mode the game's trace once it is over."""
+    if tracer is None or tracer.written:
+        return
+    if TRACE_PER_GAME:
+        if not game_over:
+            return
+        tracer.written = True  # Later requests on a finished game don't rewrite it
+    _writer.submit(tracer.write, TRACE_DIR)
+
+
+@contextmanager
+def trace_scope(tracer):
+    """Make `tracer` collect the spans of the enclosed block."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def span(name, **args):
+    """Time the enclosed block as a span of the current trace, if any."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.add_span(name, start, time.perf_counter(), args)
+
+
+def traced(func):
+    """Decorator recording each call of `func` as a span named module.qualname."""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_tracer.get() is None:
+            return func(*args, **kwargs)
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
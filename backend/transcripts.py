@@ -0,0 +1,58 @@
+"""Recording finished games as JSON Lines transcripts."""
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator
+
+TRANSCRIPT_PATH = os.getenv("TRANSCRIPT_PATH")  # Finished games are appended here when set
+
+_write_lock = threading.Lock()
+
+
+def _player_model(player) -> str:
+    """Model name of an LLM player, or "human"."""
+    return getattr(player, "model", None) or "human"
+
+
+def build_transcript(game: Dict) -> Dict:
+    """Build the transcript record of a game."""
+    gs = game["game_state"]
+    return {
+        "session_id": game.get("session_id"),
+        "finished_at": time.time(),
+        "object": gs.object,
+        "status": gs.status,
+        "question_count": gs.question_count,
+        "player1_type": game["player1_type"],
+        "player2_type": game["player2_type"],
+        "player1_model": _player_model(game["player1"]),
+        "player2_model": _player_model(game["player2"]),
+        "turns": list(gs.history),
+        "player2_compaction": getattr(game["player2"], "compaction_stats", []),
+    }
+
+
+def save_transcript_if_finished(game: Dict, path: str = None) -> None:
+    """Append the game's transcript once it is over, if recording is enabled."""
+    path = path or TRANSCRIPT_PATH
+    if not path or game["game_state"].is_playing() or game.get("transcript_saved"):
+        return
+    game["transcript_saved"] = True
+    line = json.dumps(build_transcript(game))
+    with _write_lock:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+def iter_transcripts(path: str) -> Iterator[Dict]:
+    """Stream transcripts from a JSON Lines file, skipping malformed lines."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
@@ -1,7 +1,9 @@
 """Response validation utilities."""
 import re
+from .tracing import traced
 
 
+@traced
 def validate_yes_no(answer):
     """Normalise yes/no answer to "yes" or "no"."""
     if not answer:
@@ -15,6 +17,7 @@ def validate_yes_no(answer):
     return "no"
 
 
+@traced
 def validate_guess(guess):
     """Extract object name from guess, removing common prefixes."""
     if not guess:
@@ -43,3 +46,72 @@ def validate_guess(guess):
     
     return cleaned if cleaned else guess
 
+
+
+# Words that carry no meaning for comparing yes/no questions
+QUESTION_STOPWORDS = {
+    "is", "it", "the", "does", "do", "can", "could", "would", "you", "your",
+    "something", "thing", "things", "that", "of", "be", "are", "its",
+    "this", "typically", "usually", "generally", "commonly", "kind", "type", "sort", "one",
+}
+
+# Leading verbs mapped onto the kind of question they ask: "Is it a wheel?"
+# and "Does it have wheels?" share a noun but ask different things
+QUESTION_FRAMES = {
+    "is": "is", "are": "is", "was": "is",
+    "does": "does", "do": "does", "did": "does",
+    "can": "can", "could": "can",
+    "has": "have", "have": "have",
+}
+QUESTION_ARTICLES = {"a", "an"}
+# Nouns that turn "a ... thing" into an adjective, as in "Is it a living thing?"
+QUESTION_PLACEHOLDERS = {"thing", "things", "something", "object"}
+
+# Paraphrases mapped onto one canonical word
+QUESTION_SYNONYMS = {
+    "alive": "living", "live": "living", "edible": "eat", "eaten": "eat", "food": "eat",
+    "inside": "indoors", "indoor": "indoors", "outside": "outdoors", "outdoor": "outdoors",
+    "big": "large", "huge": "large", "bigger": "larger", "small": "little", "tiny": "little",
+    "smaller": "littler", "mechanical": "machine", "electric": "electronic",
+}
+
+
+def normalize_question(question):
+    """Reduce a yes/no question to canonical tokens for similarity checks.
+    
+    The leading verb and the article are kept, since they tell an identity
+    question from a property one:
+    
+    >>> normalize_question("Is it a living thing?"), normalize_question("Is it alive?")
+    (['is', 'living'], ['is', 'living'])
+    >>> normalize_question("Does it have wheels?"), normalize_question("Is it a wheel?")
+    (['does', 'have', 'wheel'], ['is', 'a', 'wheel'])
+    >>> normalize_question("Can it fly?"), normalize_question("Is it a fly?")
+    (['can', 'fly'], ['is', 'a', 'fly'])
+    >>> normalize_question("Is it a dog?"), normalize_question("Does it have a dog?")
+    (['is', 'a', 'dog'], ['does', 'have', 'a', 'dog'])
+    """
+    if not question:
+        return []
+    
+    tokens = re.findall(r"[a-z0-9]+", question.lower())
+    adjectival = any(token in QUESTION_PLACEHOLDERS for token in tokens)
+    normalized = []
+    if tokens and tokens[0] in QUESTION_FRAMES:
+        normalized.append(QUESTION_FRAMES[tokens[0]])
+        tokens = tokens[1:]
+    for token in tokens:
+        if token in QUESTION_ARTICLES:
+            if not adjectival:
+                normalized.append("a")
+            continue
+        if token in ("has", "have"):
+            normalized.append("have")
+            continue
+        if token in QUESTION_STOPWORDS:
+            continue
+        # Light stemming of plurals ("wheels" -> "wheel"), leaving "glass" alone
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        normalized.append(QUESTION_SYNONYMS.get(token, token))
+    return normalized
@@ -1,6 +1,8 @@
 """Run the REST API server."""
 import uvicorn
+from dotenv import load_dotenv
 
 if __name__ == "__main__":
+    load_dotenv()  # Once per process here, workers inherit the environment
     uvicorn.run("backend.api:app", host="0.0.0.0", port=8000, reload=True)
 